@@ -1,8 +1,29 @@
 #!/usr/bin/python
+import time
+
 from .utils import minimize_node_ref_count
 from .. import QtWidgets
 from ..constants import IN_PORT, OUT_PORT
 
+# consecutive changes to the same node property pushed within this many
+# seconds are merged into a single undo step (eg. dragging a slider).
+_MERGE_INTERVAL = 0.5
+
+
+def _merge_id(node, name):
+    """
+    Returns a QUndoCommand id for the node and name pair (never -1).
+    """
+    return hash((id(node), name)) & 0x7FFFFFFF
+
+
+def _same_pos(pos, other_pos):
+    """
+    Returns true if the positions match, ignoring floating point noise.
+    """
+    return (abs(pos[0] - other_pos[0]) < 1e-9 and
+            abs(pos[1] - other_pos[1]) < 1e-9)
+
 
 class PropertyChangedCmd(QtWidgets.QUndoCommand):
     """
@@ -24,31 +45,59 @@ class PropertyChangedCmd(QtWidgets.QUndoCommand):
         self.name = name
         self.old_val = node.get_property(name)
         self.new_val = value
+        self._time = time.monotonic()
+        self._model = node.model
+        self._view = node.view
+        self._graph = node.graph
+
+        # resolve the widget and view property lookups once instead of on
+        # every undo/redo ("view.properties" builds a new dict each call).
+        view = self._view
+        self._is_widget = hasattr(view, 'has_widget') and view.has_widget(name)
+        self._is_view_prop = name in view.properties
 
     def set_node_prop(self, name, value):
         """
         updates the node view and model.
         """
         # set model data.
-        model = self.node.model
-        model.set_property(name, value)
+        self._model.set_property(name, value)
 
         # set view data.
-        view = self.node.view
+        view = self._view
 
         # view widgets.
-        if hasattr(view, 'widgets') and name in view.widgets.keys():
+        if self._is_widget:
             # check if previous value is identical to current value,
             # prevent signals from causing a infinite loop.
-            if view.widgets[name].value != value:
-                view.widgets[name].value = value
+            widget = view.get_widget(name)
+            if widget.value != value:
+                widget.value = value
 
         # view properties.
-        if name in view.properties.keys():
+        if self._is_view_prop:
             # remap "pos" to "xy_pos" node view has pre-existing pos method.
             if name == 'pos':
                 name = 'xy_pos'
-            setattr(view, name, value)
+            if getattr(view, name) != value:
+                setattr(view, name, value)
+
+    def id(self):
+        return _merge_id(self.node, self.name)
+
+    def mergeWith(self, other):
+        if not isinstance(other, PropertyChangedCmd):
+            return False
+        if other.node is not self.node or other.name != self.name:
+            return False
+        if other._time - self._time > _MERGE_INTERVAL:
+            return False
+        self.new_val = other.new_val
+        self._time = other._time
+        if self.name == 'name':
+            self.setText(
+                'renamed "{}" to "{}"'.format(self.old_val, self.new_val))
+        return True
 
     def undo(self):
         do_undo = False
@@ -62,8 +111,8 @@ class PropertyChangedCmd(QtWidgets.QUndoCommand):
             self.set_node_prop(self.name, self.old_val)
 
             # emit property changed signal.
-            graph = self.node.graph
-            graph.property_changed.emit(self.node, self.name, self.old_val)
+            self._graph.property_changed.emit(
+                self.node, self.name, self.old_val)
 
     def redo(self):
         do_redo = False
@@ -77,8 +126,8 @@ class PropertyChangedCmd(QtWidgets.QUndoCommand):
             self.set_node_prop(self.name, self.new_val)
 
             # emit property changed signal.
-            graph = self.node.graph
-            graph.property_changed.emit(self.node, self.name, self.new_val)
+            self._graph.property_changed.emit(
+                self.node, self.name, self.new_val)
 
 
 class NodeMovedCmd(QtWidgets.QUndoCommand):
@@ -96,16 +145,21 @@ class NodeMovedCmd(QtWidgets.QUndoCommand):
         self.node = node
         self.pos = pos
         self.prev_pos = prev_pos
+        self._model = node.model
+        self._view = node.view
+        self._noop = _same_pos(pos, prev_pos)
 
     def undo(self):
-        self.node.view.xy_pos = self.prev_pos
-        self.node.model.pos = self.prev_pos
+        if self._noop:
+            return
+        self._view.xy_pos = self.prev_pos
+        self._model.pos = self.prev_pos
 
     def redo(self):
-        if self.pos == self.prev_pos:
+        if self._noop:
             return
-        self.node.view.xy_pos = self.pos
-        self.node.model.pos = self.pos
+        self._view.xy_pos = self.pos
+        self._model.pos = self.pos
 
 
 class NodeAddedCmd(QtWidgets.QUndoCommand):
@@ -126,6 +180,7 @@ class NodeAddedCmd(QtWidgets.QUndoCommand):
         self.node = node
         self.pos = pos
         self.node_parent = node.parent()
+        self._view = node.view
 
     def undo(self):
         self.pos = self.pos or self.node.pos()
@@ -134,7 +189,7 @@ class NodeAddedCmd(QtWidgets.QUndoCommand):
 
     def redo(self):
         self.model.nodes[self.node.id] = self.node
-        self.viewer.add_node(self.node.view, self.pos)
+        self.viewer.add_node(self._view, self.pos)
         self.node.set_parent(self.node_parent)
 
 
@@ -156,24 +211,64 @@ class NodeRemovedCmd(QtWidgets.QUndoCommand):
         self.inputs = []
         self.outputs = []
         self.node_parent = node.parent()
+        self._view = node.view
 
+        # store the connections as (node id, port name) pairs rather than
+        # port objects so deleted nodes aren't kept alive by the undo stack.
         if hasattr(self.node, 'inputs'):
-            input_ports = self.node.input_ports()
-            self.inputs = [(p, p.connected_ports()) for p in input_ports]
+            self.inputs = [(p.name(), self._port_connections(p))
+                           for p in self.node.input_ports()]
         if hasattr(self.node, 'outputs'):
-            output_ports = self.node.output_ports()
-            self.outputs = [(p, p.connected_ports()) for p in output_ports]
+            self.outputs = [(p.name(), self._port_connections(p))
+                            for p in self.node.output_ports()]
+
+    @staticmethod
+    def _port_connections(port):
+        """
+        Returns:
+            tuple(tuple(str, str)): (node id, port name) connections of port.
+        """
+        return tuple((node_id, port_name)
+                     for node_id, port_names
+                     in port.model.connected_ports.items()
+                     for port_name in port_names)
+
+    def _connected_ports(self):
+        """
+        Resolve the stored connections back to port objects.
+
+        Returns:
+            list[tuple(NodeGraphQt.Port, NodeGraphQt.Port)]: node port and
+                connected port pairs.
+        """
+        ports = []
+        nodes = self.model.nodes
+        node_inputs = self.node.inputs() if self.inputs else {}
+        for name, connections in self.inputs:
+            port = node_inputs[name]
+            for node_id, port_name in connections:
+                node = nodes.get(node_id)
+                if node:
+                    ports.append((port, node.outputs()[port_name]))
+        node_outputs = self.node.outputs() if self.outputs else {}
+        for name, connections in self.outputs:
+            port = node_outputs[name]
+            for node_id, port_name in connections:
+                node = nodes.get(node_id)
+                if node:
+                    ports.append((port, node.inputs()[port_name]))
+        return ports
 
     def undo(self):
         self.model.nodes[self.node.id] = self.node
-        self.scene.addItem(self.node.view)
-        [port.connect_to(p) for port, connected_ports in self.inputs for p in connected_ports]
-        [port.connect_to(p) for port, connected_ports in self.outputs for p in connected_ports]
+        self.scene.addItem(self._view)
+        for port, connected_port in self._connected_ports():
+            port.connect_to(connected_port)
         self.node.set_parent(self.node_parent)
 
     def redo(self):
-        [port.disconnect_from(p) for port, connected_ports in self.inputs for p in connected_ports]
-        [port.disconnect_from(p) for port, connected_ports in self.outputs for p in connected_ports]
+        for port, connected_port in self._connected_ports():
+            port.disconnect_from(connected_port)
         self.model.nodes.pop(self.node.id)
         self.node.delete()
 
@@ -248,35 +343,33 @@ class PortConnectedCmd(QtWidgets.QUndoCommand):
         QtWidgets.QUndoCommand.__init__(self)
         self.source = src_port
         self.target = trg_port
+        self._src_model = src_port.model
+        self._trg_model = trg_port.model
+        self._src_id = src_port.node().id
+        self._trg_id = trg_port.node().id
+        self._src_name = src_port.name()
+        self._trg_name = trg_port.name()
 
     def undo(self):
-        src_model = self.source.model
-        trg_model = self.target.model
-        src_id = self.source.node().id
-        trg_id = self.target.node().id
-
-        port_names = src_model.connected_ports.get(trg_id)
-        if port_names is []:
-            del src_model.connected_ports[trg_id]
-        if port_names and self.target.name() in port_names:
-            port_names.remove(self.target.name())
-
-        port_names = trg_model.connected_ports.get(src_id)
-        if port_names is []:
-            del trg_model.connected_ports[src_id]
-        if port_names and self.source.name() in port_names:
-            port_names.remove(self.source.name())
+        src_ports = self._src_model.connected_ports
+        port_names = src_ports.get(self._trg_id)
+        if port_names is not None:
+            port_names.pop(self._trg_name, None)
+            if not port_names:
+                del src_ports[self._trg_id]
+
+        trg_ports = self._trg_model.connected_ports
+        port_names = trg_ports.get(self._src_id)
+        if port_names is not None:
+            port_names.pop(self._src_name, None)
+            if not port_names:
+                del trg_ports[self._src_id]
 
         self.source.view.disconnect_from(self.target.view)
 
     def redo(self):
-        src_model = self.source.model
-        trg_model = self.target.model
-        src_id = self.source.node().id
-        trg_id = self.target.node().id
-
-        src_model.connected_ports[trg_id].append(self.target.name())
-        trg_model.connected_ports[src_id].append(self.source.name())
+        self._src_model.connected_ports[self._trg_id][self._trg_name] = None
+        self._trg_model.connected_ports[self._src_id][self._src_name] = None
 
         self.source.view.connect_to(self.target.view)
 
@@ -294,35 +387,33 @@ class PortDisconnectedCmd(QtWidgets.QUndoCommand):
         QtWidgets.QUndoCommand.__init__(self)
         self.source = src_port
         self.target = trg_port
+        self._src_model = src_port.model
+        self._trg_model = trg_port.model
+        self._src_id = src_port.node().id
+        self._trg_id = trg_port.node().id
+        self._src_name = src_port.name()
+        self._trg_name = trg_port.name()
 
     def undo(self):
-        src_model = self.source.model
-        trg_model = self.target.model
-        src_id = self.source.node().id
-        trg_id = self.target.node().id
-
-        src_model.connected_ports[trg_id].append(self.target.name())
-        trg_model.connected_ports[src_id].append(self.source.name())
+        self._src_model.connected_ports[self._trg_id][self._trg_name] = None
+        self._trg_model.connected_ports[self._src_id][self._src_name] = None
 
         self.source.view.connect_to(self.target.view)
 
     def redo(self):
-        src_model = self.source.model
-        trg_model = self.target.model
-        src_id = self.source.node().id
-        trg_id = self.target.node().id
-
-        port_names = src_model.connected_ports.get(trg_id)
-        if port_names is []:
-            del src_model.connected_ports[trg_id]
-        if port_names and self.target.name() in port_names:
-            port_names.remove(self.target.name())
-
-        port_names = trg_model.connected_ports.get(src_id)
-        if port_names is []:
-            del trg_model.connected_ports[src_id]
-        if port_names and self.source.name() in port_names:
-            port_names.remove(self.source.name())
+        src_ports = self._src_model.connected_ports
+        port_names = src_ports.get(self._trg_id)
+        if port_names is not None:
+            port_names.pop(self._trg_name, None)
+            if not port_names:
+                del src_ports[self._trg_id]
+
+        trg_ports = self._trg_model.connected_ports
+        port_names = trg_ports.get(self._src_id)
+        if port_names is not None:
+            port_names.pop(self._src_name, None)
+            if not port_names:
+                del trg_ports[self._src_id]
 
         self.source.view.disconnect_from(self.target.view)
 
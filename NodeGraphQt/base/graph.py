@@ -1016,8 +1016,12 @@ class NodeGraph(QtCore.QObject):
         root_node = self.root_node()
         self.nodes_deleted.emit([n.id for n in nodes])
         self._undo_stack.beginMacro('delete nodes')
-        [self.delete_nodes(n.children()) for n in nodes if isinstance(n, SubGraph)]
-        [self._undo_stack.push(NodeRemovedCmd(self, n)) for n in nodes if n is not root_node]
+        for n in nodes:
+            if isinstance(n, SubGraph):
+                self.delete_nodes(n.children())
+        for n in nodes:
+            if n is not root_node:
+                self._undo_stack.push(NodeRemovedCmd(self, n))
         self._undo_stack.endMacro()
 
     def delete_pipe(self, pipe):
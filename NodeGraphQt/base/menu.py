@@ -1,7 +1,6 @@
 #!/usr/bin/python
-from distutils.version import LooseVersion
-
-from .. import QtGui, QtCore
+from .. import QtGui
+from ..constants import QT_GE_5_10
 from ..errors import NodeMenuError
 from ..widgets.actions import BaseMenu, GraphAction, NodeAction
 
@@ -126,7 +125,7 @@ class NodeGraphMenu(object):
         """
         action = GraphAction(name, self._graph.viewer())
         action.graph = self._graph
-        if LooseVersion(QtCore.qVersion()) >= LooseVersion('5.10'):
+        if QT_GE_5_10:
             action.setShortcutVisibleInContextMenu(True)
         if shortcut:
             action.setShortcut(shortcut)
@@ -194,7 +193,7 @@ class NodesMenu(NodeGraphMenu):
 
         action = NodeAction(name, self._graph.viewer())
         action.graph = self._graph
-        if LooseVersion(QtCore.qVersion()) >= LooseVersion('5.10'):
+        if QT_GE_5_10:
             action.setShortcutVisibleInContextMenu(True)
         if func:
             action.executed.connect(func)
@@ -19,7 +19,9 @@ class PortModel(object):
         self.display_name = True
         self.multi_connection = False
         self.visible = True
-        self.connected_ports = defaultdict(list)
+        # {<node_id>: {<port_name>: None, <port_name>: None}}
+        # (dict used as an insertion ordered set.)
+        self.connected_ports = defaultdict(dict)
         self.data_type = 'NoneType'
 
     def __repr__(self):
@@ -43,7 +45,10 @@ class PortModel(object):
         """
         props = self.__dict__.copy()
         props.pop('node')
-        props['connected_ports'] = dict(props.pop('connected_ports'))
+        props['connected_ports'] = {
+            node_id: sorted(port_names)
+            for node_id, port_names in props.pop('connected_ports').items()
+        }
         return props
 
 
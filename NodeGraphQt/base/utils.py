@@ -1,13 +1,12 @@
 #!/usr/bin/python
-from distutils.version import LooseVersion
-
-from .. import QtGui, QtCore
+from .. import QtGui
 from ..constants import (PIPE_LAYOUT_CURVED,
                          PIPE_LAYOUT_STRAIGHT,
                          PIPE_LAYOUT_ANGLE,
                          NODE_LAYOUT_VERTICAL,
                          NODE_LAYOUT_HORIZONTAL,
-                         NODE_LAYOUT_DIRECTION)
+                         NODE_LAYOUT_DIRECTION,
+                         QT_GE_5_10)
 
 
 # menu
@@ -39,73 +38,46 @@ def setup_context_menu(graph):
     edit_menu = root_menu.add_menu('&Edit')
 
     # create "File" menu.
-    file_menu.add_command('Open...', _open_session, QtGui.QKeySequence.Open)
-    file_menu.add_command('Import...', _import_session)
-    file_menu.add_command('Save...', _save_session, QtGui.QKeySequence.Save)
-    file_menu.add_command('Save As...', _save_session_as, 'Ctrl+Shift+S')
-    file_menu.add_command('New Session', _new_session)
-
-    file_menu.add_separator()
-
-    file_menu.add_command('Zoom In', _zoom_in, '=')
-    file_menu.add_command('Zoom Out', _zoom_out, '-')
-    file_menu.add_command('Reset Zoom', _reset_zoom, 'H')
+    _add_menu_commands(file_menu, _FILE_MENU_COMMANDS)
 
     # create "Edit" menu.
     undo_actn = graph.undo_stack().createUndoAction(graph.viewer(), '&Undo')
-    if LooseVersion(QtCore.qVersion()) >= LooseVersion('5.10'):
+    if QT_GE_5_10:
         undo_actn.setShortcutVisibleInContextMenu(True)
     undo_actn.setShortcuts(QtGui.QKeySequence.Undo)
     edit_menu.qmenu.addAction(undo_actn)
 
     redo_actn = graph.undo_stack().createRedoAction(graph.viewer(), '&Redo')
-    if LooseVersion(QtCore.qVersion()) >= LooseVersion('5.10'):
+    if QT_GE_5_10:
         redo_actn.setShortcutVisibleInContextMenu(True)
     redo_actn.setShortcuts(QtGui.QKeySequence.Redo)
     edit_menu.qmenu.addAction(redo_actn)
 
-    edit_menu.add_separator()
-    edit_menu.add_command('Clear Undo History', _clear_undo)
-    edit_menu.add_command('Show Undo View', _show_undo_view)
-    edit_menu.add_separator()
-
-    edit_menu.add_command('Copy', _copy_nodes, QtGui.QKeySequence.Copy)
-    edit_menu.add_command('Cut', _cut_nodes, QtGui.QKeySequence.Cut)
-    edit_menu.add_command('Paste', _paste_nodes, QtGui.QKeySequence.Paste)
-    edit_menu.add_command('Delete', _delete_items, QtGui.QKeySequence.Delete)
-
-    edit_menu.add_separator()
+    _add_menu_commands(edit_menu, _EDIT_MENU_COMMANDS)
 
-    edit_menu.add_command('Select all', _select_all_nodes, 'Ctrl+A')
-    edit_menu.add_command('Deselect all', _clear_node_selection, 'Ctrl+Shift+A')
-    edit_menu.add_command('Enable/Disable', _disable_nodes, 'D')
-
-    edit_menu.add_command('Duplicate', _duplicate_nodes, 'Alt+C')
-    edit_menu.add_command('Center Selection', _fit_to_selection, 'F')
-
-    edit_menu.add_separator()
-
-    edit_menu.add_command('Layout Graph Up Stream', _layout_graph_up, 'L')
-    edit_menu.add_command('Layout Graph Down Stream', _layout_graph_down, 'Ctrl+L')
-
-    edit_menu.add_separator()
+    pipe_menu = edit_menu.add_menu('&Pipe')
+    _add_menu_commands(pipe_menu, _PIPE_MENU_COMMANDS)
 
-    edit_menu.add_command('Jump In', _jump_in, 'I')
-    edit_menu.add_command('Jump Out', _jump_out, 'O')
+    bg_menu = edit_menu.add_menu('&Grid Mode')
+    _add_menu_commands(bg_menu, _GRID_MENU_COMMANDS)
 
     edit_menu.add_separator()
 
-    pipe_menu = edit_menu.add_menu('&Pipe')
-    pipe_menu.add_command('Curved Pipe', _curved_pipe)
-    pipe_menu.add_command('Straight Pipe', _straight_pipe)
-    pipe_menu.add_command('Angle Pipe', _angle_pipe)
 
-    bg_menu = edit_menu.add_menu('&Grid Mode')
-    bg_menu.add_command('None', _bg_grid_none)
-    bg_menu.add_command('Lines', _bg_grid_lines)
-    bg_menu.add_command('Dots', _bg_grid_dots)
+def _add_menu_commands(menu, commands):
+    """
+    Populate the menu from a list of command specs.
 
-    edit_menu.add_separator()
+    Args:
+        menu (NodeGraphQt.NodeGraphMenu): menu to populate.
+        commands (list[tuple]): (name, func, shortcut) tuples, "None"
+            entries add a separator.
+    """
+    for command in commands:
+        if command is None:
+            menu.add_separator()
+        else:
+            menu.add_command(*command)
 
 
 # --- menu command functions. ---
@@ -328,6 +300,57 @@ def _layout_graph_down(graph):
 def _layout_graph_up(graph):
     __layout_graph(graph, False)
 
+
+# --- menu command specs: (name, func, shortcut), "None" is a separator. ---
+
+_FILE_MENU_COMMANDS = [
+    ('Open...', _open_session, QtGui.QKeySequence.Open),
+    ('Import...', _import_session, None),
+    ('Save...', _save_session, QtGui.QKeySequence.Save),
+    ('Save As...', _save_session_as, 'Ctrl+Shift+S'),
+    ('New Session', _new_session, None),
+    None,
+    ('Zoom In', _zoom_in, '='),
+    ('Zoom Out', _zoom_out, '-'),
+    ('Reset Zoom', _reset_zoom, 'H'),
+]
+
+_EDIT_MENU_COMMANDS = [
+    None,
+    ('Clear Undo History', _clear_undo, None),
+    ('Show Undo View', _show_undo_view, None),
+    None,
+    ('Copy', _copy_nodes, QtGui.QKeySequence.Copy),
+    ('Cut', _cut_nodes, QtGui.QKeySequence.Cut),
+    ('Paste', _paste_nodes, QtGui.QKeySequence.Paste),
+    ('Delete', _delete_items, QtGui.QKeySequence.Delete),
+    None,
+    ('Select all', _select_all_nodes, 'Ctrl+A'),
+    ('Deselect all', _clear_node_selection, 'Ctrl+Shift+A'),
+    ('Enable/Disable', _disable_nodes, 'D'),
+    ('Duplicate', _duplicate_nodes, 'Alt+C'),
+    ('Center Selection', _fit_to_selection, 'F'),
+    None,
+    ('Layout Graph Up Stream', _layout_graph_up, 'L'),
+    ('Layout Graph Down Stream', _layout_graph_down, 'Ctrl+L'),
+    None,
+    ('Jump In', _jump_in, 'I'),
+    ('Jump Out', _jump_out, 'O'),
+    None,
+]
+
+_PIPE_MENU_COMMANDS = [
+    ('Curved Pipe', _curved_pipe, None),
+    ('Straight Pipe', _straight_pipe, None),
+    ('Angle Pipe', _angle_pipe, None),
+]
+
+_GRID_MENU_COMMANDS = [
+    ('None', _bg_grid_none, None),
+    ('Lines', _bg_grid_lines, None),
+    ('Dots', _bg_grid_dots, None),
+]
+
 # topological_sort
 
 
@@ -380,10 +403,7 @@ def _has_input_node(node):
         bool.
     """
 
-    for p in node.input_ports():
-        if p.view.connected_pipes:
-            return True
-    return False
+    return any(p.view.connected_pipes for p in node.input_ports())
 
 
 def _has_output_node(node):
@@ -396,10 +416,7 @@ def _has_output_node(node):
         bool.
     """
 
-    for p in node.output_ports():
-        if p.view.connected_pipes:
-            return True
-    return False
+    return any(p.view.connected_pipes for p in node.output_ports())
 
 
 def _build_down_stream_graph(start_nodes):
@@ -414,16 +431,18 @@ def _build_down_stream_graph(start_nodes):
 
     graph = {}
     for node in start_nodes:
-        output_nodes = get_output_nodes(node)
-        graph[node] = output_nodes
+        if node in graph:
+            continue
+        output_nodes = {node}
         while output_nodes:
-            _output_nodes = []
+            _output_nodes = set()
             for n in output_nodes:
-                if n not in graph:
-                    nodes = get_output_nodes(n)
-                    graph[n] = nodes
-                    _output_nodes.extend(nodes)
-            output_nodes = _output_nodes
+                nodes = get_output_nodes(n)
+                graph[n] = nodes
+                _output_nodes.update(nodes)
+            # one dict lookup per candidate, nodes already in the graph
+            # are never queued again.
+            output_nodes = {n for n in _output_nodes if n not in graph}
     return graph
 
 
@@ -439,16 +458,18 @@ def _build_up_stream_graph(start_nodes):
 
     graph = {}
     for node in start_nodes:
-        input_nodes = get_input_nodes(node)
-        graph[node] = input_nodes
+        if node in graph:
+            continue
+        input_nodes = {node}
         while input_nodes:
-            _input_nodes = []
+            _input_nodes = set()
             for n in input_nodes:
-                if n not in graph:
-                    nodes = get_input_nodes(n)
-                    graph[n] = nodes
-                    _input_nodes.extend(nodes)
-            input_nodes = _input_nodes
+                nodes = get_input_nodes(n)
+                graph[n] = nodes
+                _input_nodes.update(nodes)
+            # one dict lookup per candidate, nodes already in the graph
+            # are never queued again.
+            input_nodes = {n for n in _input_nodes if n not in graph}
     return graph
 
 
@@ -467,20 +488,28 @@ def _sort_nodes(graph, start_nodes, reverse=True):
     if not graph:
         return []
 
-    visit = dict((node, False) for node in graph.keys())
+    visited = set()
 
     sorted_nodes = []
 
     def dfs(start_node):
-        for end_node in graph[start_node]:
-            if not visit[end_node]:
-                visit[end_node] = True
-                dfs(end_node)
-        sorted_nodes.append(start_node)
+        # iterative post-order traversal, avoids hitting the recursion
+        # limit on deep graphs.
+        stack = [(start_node, iter(graph[start_node]))]
+        while stack:
+            node, children = stack[-1]
+            for end_node in children:
+                if end_node not in visited:
+                    visited.add(end_node)
+                    stack.append((end_node, iter(graph[end_node])))
+                    break
+            else:
+                stack.pop()
+                sorted_nodes.append(node)
 
     for start_node in start_nodes:
-        if not visit[start_node]:
-            visit[start_node] = True
+        if start_node not in visited:
+            visited.add(start_node)
             dfs(start_node)
 
     if reverse:
@@ -523,7 +552,7 @@ def topological_sort_by_down(start_nodes=None, all_nodes=None):
         start_nodes = [n for n in all_nodes if not _has_input_node(n)]
     if not start_nodes:
         return []
-    if not [n for n in start_nodes if _has_output_node(n)]:
+    if not any(_has_output_node(n) for n in start_nodes):
         return start_nodes
 
     graph = _build_down_stream_graph(start_nodes)
@@ -556,7 +585,7 @@ def topological_sort_by_up(start_nodes=None, all_nodes=None):
         start_nodes = [n for n in all_nodes if not _has_output_node(n)]
     if not start_nodes:
         return []
-    if not [n for n in start_nodes if _has_input_node(n)]:
+    if not any(_has_input_node(n) for n in start_nodes):
         return start_nodes
 
     graph = _build_up_stream_graph(start_nodes)
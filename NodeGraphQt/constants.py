@@ -2,11 +2,15 @@
 # -*- coding: utf-8 -*-
 import os
 from .pkg_info import __version__
-from . import QtWidgets
+from . import QtWidgets, QtCore
 
 #: Current version of the NodeGraphQt framework.
 VERSION = __version__
 
+# the Qt version can't change at runtime so only check it once.
+QT_GE_5_10 = tuple(
+    int(v) for v in QtCore.qVersion().split('.')[:2]) >= (5, 10)
+
 # === PIPE ===
 
 PIPE_WIDTH = 1.2
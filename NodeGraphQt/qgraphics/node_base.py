@@ -812,8 +812,10 @@ class NodeItem(AbstractNodeItem):
         return name in self._widgets.keys()
 
     def delete(self):
-        [port.delete() for port, text in self._input_items.items()]
-        [port.delete() for port, text in self._output_items.items()]
+        for port in self._input_items:
+            port.delete()
+        for port in self._output_items:
+            port.delete()
         super(NodeItem, self).delete()
 
     def from_dict(self, node_dict):